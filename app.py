@@ -1,17 +1,10 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import openai
 from datetime import datetime
 import os
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
 import io
 import json
+from historial_informes import calcular_hash_datos, calcular_clave_informe, buscar_informe, guardar_informe, listar_informes
 
 # Configuración de la página
 st.set_page_config(
@@ -20,10 +13,6 @@ st.set_page_config(
     layout="wide"
 )
 
-# Obtener API key de OpenAI
-openai_key = st.secrets["OPENAI_API_KEY"]
-openai.api_key = openai_key
-
 # Título principal
 st.title("🎯 Identificador de Clientes Potenciales")
 st.markdown("### Sistema de análisis para empresas de empaques y termoformados")
@@ -134,15 +123,15 @@ def identificar_clientes_potenciales(df):
     ).round(2)
     
     # Reemplazar infinitos y NaN con 0
-    df_trabajo['CRECIMIENTO_INGRESOS'] = df_trabajo['CRECIMIENTO_INGRESOS'].replace([np.inf, -np.inf], 0).fillna(0)
-    df_trabajo['MARGEN_GANANCIA_2024'] = df_trabajo['MARGEN_GANANCIA_2024'].replace([np.inf, -np.inf], 0).fillna(0)
-    df_trabajo['RATIO_ENDEUDAMIENTO'] = df_trabajo['RATIO_ENDEUDAMIENTO'].replace([np.inf, -np.inf], 0).fillna(0)
+    df_trabajo['CRECIMIENTO_INGRESOS'] = df_trabajo['CRECIMIENTO_INGRESOS'].replace([float('inf'), float('-inf')], 0).fillna(0)
+    df_trabajo['MARGEN_GANANCIA_2024'] = df_trabajo['MARGEN_GANANCIA_2024'].replace([float('inf'), float('-inf')], 0).fillna(0)
+    df_trabajo['RATIO_ENDEUDAMIENTO'] = df_trabajo['RATIO_ENDEUDAMIENTO'].replace([float('inf'), float('-inf')], 0).fillna(0)
     
     return df_trabajo
 
-def analizar_empresa_con_gpt(empresa_data):
-    """Usa GPT para analizar por qué una empresa sería un buen cliente"""
-    prompt = f"""
+def construir_prompt_analisis(empresa_data):
+    """Construye el prompt de análisis de una empresa para GPT"""
+    return f"""
     Analiza la siguiente empresa como cliente potencial para una compañía que vende 
     fundas, termoformados, empaques y bolsas para alimentos:
     
@@ -160,23 +149,78 @@ def analizar_empresa_con_gpt(empresa_data):
     2. Qué tipo de empaques probablemente necesitaría
     3. Su solidez financiera para ser un cliente confiable
     """
-    
+
+def _obtener_openai():
+    """Importa openai y configura la API key en el primer uso"""
+    # openai y los secrets solo se cargan cuando se solicita un análisis con GPT
+    import openai
+    if not openai.api_key:
+        try:
+            openai.api_key = st.secrets["OPENAI_API_KEY"]
+        except Exception:
+            raise RuntimeError("OPENAI_API_KEY no está configurada en los secrets de Streamlit")
+    return openai
+
+def _mensajes_analisis(empresa_data):
+    """Mensajes de chat usados en el análisis GPT de una empresa"""
+    return [
+        {"role": "system", "content": "Eres un analista de negocios experto en la industria de empaques."},
+        {"role": "user", "content": construir_prompt_analisis(empresa_data)}
+    ]
+
+def analizar_empresa_con_gpt(empresa_data):
+    """Usa GPT para analizar por qué una empresa sería un buen cliente
+
+    Devuelve el texto del análisis y si se obtuvo correctamente.
+    """
     try:
-        response = openai.ChatCompletion.create(
+        response = _obtener_openai().ChatCompletion.create(
             model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "Eres un analista de negocios experto en la industria de empaques."},
-                {"role": "user", "content": prompt}
-            ],
+            messages=_mensajes_analisis(empresa_data),
             max_tokens=200,
             temperature=0.7
         )
-        return response.choices[0].message.content
+        return response.choices[0].message.content, True
     except Exception as e:
-        return f"Análisis no disponible: {str(e)}"
+        return f"Análisis no disponible: {str(e)}", False
+
+def analizar_empresa_con_gpt_streaming(empresa_data, placeholder):
+    """Analiza una empresa con GPT mostrando el texto en el placeholder a medida que llegan los tokens
+
+    Devuelve el texto del análisis y si se recibió completo.
+    """
+    texto = ""
+    exito = True
+    try:
+        response = _obtener_openai().ChatCompletion.create(
+            model="gpt-3.5-turbo",
+            messages=_mensajes_analisis(empresa_data),
+            max_tokens=200,
+            temperature=0.7,
+            stream=True
+        )
+        for chunk in response:
+            fragmento = chunk.choices[0].delta.get("content", "")
+            if fragmento:
+                texto += fragmento
+                placeholder.markdown(texto + "▌")
+    except Exception as e:
+        # Conservar lo recibido antes del error para no perder el análisis parcial
+        texto = f"{texto}\n\nAnálisis no disponible: {str(e)}" if texto else f"Análisis no disponible: {str(e)}"
+        exito = False
+    placeholder.markdown(texto)
+    return texto, exito
 
 def generar_pdf(empresas_seleccionadas):
     """Genera un informe PDF con las empresas seleccionadas"""
+    # reportlab se importa aquí para no cargarlo en cada arranque de la aplicación
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.lib.enums import TA_CENTER
+    
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=letter)
     story = []
@@ -435,11 +479,16 @@ def main():
         df = cargar_datos()
         if df is not None:
             st.session_state.df = identificar_clientes_potenciales(df)
+            st.session_state.hash_datos = calcular_hash_datos(df)
             st.session_state.archivo_cargado = True
     
     if 'df' in st.session_state and st.session_state.get('archivo_cargado', False):
         df = st.session_state.df
         
+        # Sesiones que cargaron los datos antes de existir el histórico no tienen la huella
+        if 'hash_datos' not in st.session_state:
+            st.session_state.hash_datos = calcular_hash_datos(df)
+        
         # Estadísticas generales
         col1, col2, col3, col4 = st.columns(4)
         with col1:
@@ -572,6 +621,15 @@ def main():
             (df_filtrado['INGRESOS_2024'] <= ingresos_max * 1000)
         ]
         
+        filtros_aplicados = {
+            'modo_ciiu': filtro_ciiu_modo,
+            'ciiu': sorted(ciiu_seleccionados),
+            'macrosector': macrosector_sel,
+            'departamento': depto_sel,
+            'ingresos_min': ingresos_min,
+            'ingresos_max': ingresos_max
+        }
+        
         # Mostrar estadísticas de filtros aplicados
         st.sidebar.markdown("---")
         st.sidebar.subheader("📊 Resumen de Filtros")
@@ -587,7 +645,7 @@ def main():
         
         if len(df_filtrado) > 0:
             # Tabs para diferentes vistas
-            tab1, tab2, tab3 = st.tabs(["📊 Tabla de Empresas", "📈 Análisis", "📄 Generar Informe"])
+            tab1, tab2, tab3, tab4, tab5 = st.tabs(["📊 Tabla de Empresas", "📈 Análisis", "📄 Generar Informe", "🗂️ Histórico", "🔗 CRM"])
             
             with tab1:
                 # Mostrar tabla de empresas
@@ -647,36 +705,178 @@ def main():
                 if empresas_para_informe:
                     # Checkbox para incluir análisis GPT
                     incluir_analisis = st.checkbox("Incluir análisis detallado con GPT (puede tomar varios minutos)", value=False)
+                    analisis_en_vivo = st.checkbox(
+                        "Mostrar el análisis GPT en tiempo real",
+                        value=True,
+                        disabled=not incluir_analisis,
+                        help="Muestra el texto de cada empresa a medida que GPT lo genera"
+                    )
+                    regenerar = st.checkbox(
+                        "Regenerar aunque exista en el histórico",
+                        value=False,
+                        help="Ignora el informe guardado y lo vuelve a generar, reemplazándolo en el histórico"
+                    )
+                    
+                    # Filtrar empresas seleccionadas
+                    df_informe = df_filtrado[df_filtrado['RAZON_SOCIAL'].isin(empresas_para_informe)].copy()
+                    
+                    # Clave del informe en el histórico
+                    nits_informe = df_informe['NIT'].astype(str).tolist()
+                    clave_informe = calcular_clave_informe(
+                        nits_informe, filtros_aplicados, st.session_state.hash_datos, incluir_analisis
+                    )
                     
                     if st.button("🚀 Generar Informe PDF", type="primary"):
-                        with st.spinner("Generando informe..."):
-                            # Filtrar empresas seleccionadas
-                            df_informe = df_filtrado[df_filtrado['RAZON_SOCIAL'].isin(empresas_para_informe)].copy()
-                            
-                            # Agregar análisis GPT si se solicita
-                            if incluir_analisis:
-                                progress_bar = st.progress(0)
-                                for idx, (index, empresa) in enumerate(df_informe.iterrows()):
-                                    progress_bar.progress((idx + 1) / len(df_informe))
-                                    st.write(f"Analizando: {empresa['RAZON_SOCIAL']}...")
-                                    analisis = analizar_empresa_con_gpt(empresa)
-                                    df_informe.at[index, 'ANALISIS_GPT'] = analisis
-                            
-                            # Generar PDF
-                            pdf_buffer = generar_pdf(df_informe)
-                            
-                            # Botón de descarga
+                        pdf_guardado = None if regenerar else buscar_informe(clave_informe)
+                        
+                        # La configuración de OpenAI se valida una sola vez antes de analizar
+                        error_openai = None
+                        if pdf_guardado is None and incluir_analisis:
+                            try:
+                                _obtener_openai()
+                            except RuntimeError as e:
+                                error_openai = str(e)
+                        
+                        if pdf_guardado is not None:
                             st.download_button(
                                 label="📥 Descargar Informe PDF",
-                                data=pdf_buffer,
+                                data=pdf_guardado,
                                 file_name=f"informe_clientes_potenciales_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
                                 mime="application/pdf"
                             )
-                            st.success("¡Informe generado exitosamente!")
+                            st.info("Se encontró un informe idéntico en el histórico; se reutiliza sin volver a generarlo.")
+                        elif error_openai:
+                            st.error(f"No es posible incluir el análisis con GPT: {error_openai}")
+                        else:
+                            with st.spinner("Generando informe..."):
+                                # Agregar análisis GPT si se solicita
+                                analisis_completos = True
+                                if incluir_analisis:
+                                    progress_bar = st.progress(0)
+                                    for idx, (index, empresa) in enumerate(df_informe.iterrows()):
+                                        if analisis_en_vivo:
+                                            with st.expander(f"🤖 {empresa['RAZON_SOCIAL']}", expanded=True):
+                                                placeholder = st.empty()
+                                                placeholder.markdown("_Esperando respuesta de GPT..._")
+                                                analisis, exito = analizar_empresa_con_gpt_streaming(empresa, placeholder)
+                                        else:
+                                            st.write(f"Analizando: {empresa['RAZON_SOCIAL']}...")
+                                            analisis, exito = analizar_empresa_con_gpt(empresa)
+                                        df_informe.at[index, 'ANALISIS_GPT'] = analisis
+                                        analisis_completos = analisis_completos and exito
+                                        progress_bar.progress((idx + 1) / len(df_informe))
+                            
+                                # Generar PDF
+                                pdf_buffer = generar_pdf(df_informe)
+                                
+                                # Guardar en el histórico para reutilizarlo en solicitudes idénticas,
+                                # salvo que algún análisis GPT haya fallado
+                                if analisis_completos:
+                                    guardado = guardar_informe(clave_informe, pdf_buffer.getvalue(), {
+                                        'empresas': df_informe['RAZON_SOCIAL'].tolist(),
+                                        'nits': nits_informe,
+                                        'filtros': filtros_aplicados,
+                                        'hash_datos': st.session_state.hash_datos,
+                                        'incluir_gpt': bool(incluir_analisis)
+                                    })
+                                    if not guardado:
+                                        st.warning("El informe supera la cuota de disco del histórico y no se guardó.")
+                                else:
+                                    st.warning("Algunos análisis GPT no se completaron; el informe no se guardó en el histórico.")
+                                
+                                # Botón de descarga
+                                st.download_button(
+                                    label="📥 Descargar Informe PDF",
+                                    data=pdf_buffer,
+                                    file_name=f"informe_clientes_potenciales_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
+                                    mime="application/pdf"
+                                )
+                                st.success("¡Informe generado exitosamente!")
                 else:
                     st.warning("Por favor seleccione al menos una empresa para el informe.")
+            
+            with tab5:
+                st.subheader("🔗 Sincronización con CRM")
+                st.write(f"Se enviarán al CRM las **{len(df_filtrado)}** empresas filtradas que hayan cambiado desde la última sincronización.")
+                
+                url_crm = st.text_input("URL del endpoint de upsert del CRM", value=os.environ.get("CRM_URL", ""))
+                col1, col2 = st.columns(2)
+                with col1:
+                    tamano_lote = st.number_input("Empresas por lote", min_value=1, max_value=1000, value=100, step=10)
+                with col2:
+                    max_concurrencia = st.number_input("Solicitudes simultáneas", min_value=1, max_value=16, value=4)
+                simulacion = st.checkbox("Modo simulación (no envía datos)", value=True)
+                forzar_envio = st.checkbox("Reenviar todas las empresas, aunque no hayan cambiado", value=False)
+                
+                if st.button("🔄 Sincronizar con CRM", disabled=not url_crm):
+                    # requests y el módulo de sincronización solo se cargan al usarse
+                    from sync_crm import sincronizar_prospectos
+                    with st.spinner("Sincronizando con el CRM..."):
+                        resumen = sincronizar_prospectos(
+                            df_filtrado,
+                            filtros_aplicados,
+                            url_crm,
+                            token=os.environ.get("CRM_TOKEN"),
+                            tamano_lote=int(tamano_lote),
+                            max_concurrencia=int(max_concurrencia),
+                            simulacion=simulacion,
+                            forzar=forzar_envio
+                        )
+                    
+                    col1, col2, col3, col4 = st.columns(4)
+                    with col1:
+                        st.metric("Sin cambios", resumen['sin_cambios'])
+                    with col2:
+                        st.metric("Por enviar", resumen['pendientes'])
+                    with col3:
+                        st.metric("Enviadas", resumen['enviados'])
+                    with col4:
+                        st.metric("Fallidas", resumen['fallidos'])
+                    
+                    if resumen['sin_nit']:
+                        st.caption(f"⚠️ {resumen['sin_nit']} empresas sin NIT se omitieron de la sincronización")
+                    
+                    if resumen['simulacion']:
+                        st.info(f"Simulación: se enviarían {resumen['pendientes']} empresas en {resumen['lotes']} lotes.")
+                    elif resumen['fallidos']:
+                        st.error("Algunos lotes no se pudieron sincronizar:\n\n" + "\n\n".join(resumen['errores']))
+                    else:
+                        st.success("¡Sincronización completada!")
         else:
             st.warning("No se encontraron empresas que cumplan con los criterios de búsqueda.")
+            # El histórico no depende de los filtros actuales
+            tab4 = st.container()
+        
+        with tab4:
+            st.subheader("🗂️ Histórico de Informes Generados")
+            informes = listar_informes()
+            
+            if informes:
+                def _titulo_informe(informe):
+                    fecha = datetime.fromisoformat(informe['creado']).strftime('%d/%m/%Y %H:%M')
+                    return f"{fecha} — {len(informe['nits'])} empresas{' · con GPT' if informe['incluir_gpt'] else ''}"
+                
+                informe = st.selectbox("Informe:", options=informes, format_func=_titulo_informe)
+                st.write("**Empresas:** " + ", ".join(informe['empresas']))
+                st.write(f"**NITs:** {', '.join(informe['nits'])}")
+                st.json(informe['filtros'], expanded=False)
+                if informe['hash_datos'] != st.session_state.hash_datos:
+                    st.caption("⚠️ Generado con una versión distinta de la base de datos")
+                
+                # Solo se lee del disco el informe seleccionado
+                pdf_historico = buscar_informe(informe['clave'], registrar_acceso=False)
+                if pdf_historico is not None:
+                    st.download_button(
+                        label="📥 Descargar",
+                        data=pdf_historico,
+                        file_name=f"informe_clientes_potenciales_{datetime.fromisoformat(informe['creado']).strftime('%Y%m%d_%H%M%S')}.pdf",
+                        mime="application/pdf",
+                        key="descargar_historico"
+                    )
+                else:
+                    st.warning("El archivo de este informe ya no está disponible.")
+            else:
+                st.info("Aún no se han generado informes.")
         
         # Sección de información adicional
         with st.expander("ℹ️ Información sobre Códigos CIIU"):
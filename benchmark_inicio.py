@@ -0,0 +1,107 @@
+"""Mide el tiempo de arranque en frío de app.py y de sus dependencias pesadas.
+
+Además del tiempo de importación, mide el primer render completo de la
+aplicación (ejecución de main()) con streamlit.testing.v1.AppTest. Cada
+medición se hace en un proceso de Python nuevo para que ningún módulo esté
+ya cargado. Uso:
+
+    python benchmark_inicio.py [repeticiones]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+
+# Módulos que app.py debe cargar solo cuando se usan
+MODULOS_DIFERIDOS = ['openai', 'reportlab.platypus', 'reportlab.lib.styles']
+
+MODULOS_MEDIDOS = ['streamlit', 'pandas', 'openai', 'reportlab.platypus', 'app']
+
+_CODIGO_MEDICION = """
+import json, sys, time
+inicio = time.perf_counter()
+import {modulo}
+duracion = time.perf_counter() - inicio
+print(json.dumps({{'segundos': duracion, 'cargados': sorted(sys.modules)}}))
+"""
+
+# streamlit ya está importado al iniciar el cronómetro: se mide la ejecución del script
+_CODIGO_PRIMER_RENDER = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+app_test = AppTest.from_file('app.py', default_timeout=120)
+inicio = time.perf_counter()
+app_test.run()
+duracion = time.perf_counter() - inicio
+print(json.dumps({'segundos': duracion, 'cargados': sorted(sys.modules)}))
+"""
+
+
+def _ejecutar_medicion(codigo):
+    """Ejecuta el código en un proceso nuevo y devuelve la duración y los módulos cargados"""
+    resultado = subprocess.run(
+        [sys.executable, '-c', codigo],
+        cwd=DIRECTORIO,
+        capture_output=True,
+        text=True
+    )
+    if resultado.returncode != 0:
+        print(resultado.stderr.strip(), file=sys.stderr)
+        return None
+    # Streamlit puede escribir advertencias en stdout al importarse fuera de `streamlit run`
+    return json.loads(resultado.stdout.strip().splitlines()[-1])
+
+
+def medir_importacion(modulo):
+    """Importa el módulo en un proceso nuevo y devuelve la duración y los módulos cargados"""
+    return _ejecutar_medicion(_CODIGO_MEDICION.format(modulo=modulo))
+
+
+def medir_primer_render():
+    """Ejecuta app.py completo en un proceso nuevo y devuelve la duración del primer render"""
+    return _ejecutar_medicion(_CODIGO_PRIMER_RENDER)
+
+
+def main():
+    try:
+        repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    except ValueError:
+        repeticiones = 0
+    if repeticiones < 1:
+        sys.exit("Uso: python benchmark_inicio.py [repeticiones], con repeticiones >= 1")
+
+    print(f"Tiempo de importación en frío (mediana de {repeticiones} procesos)")
+    print("-" * 50)
+    for modulo in MODULOS_MEDIDOS:
+        mediciones = [medir_importacion(modulo) for _ in range(repeticiones)]
+        if any(medicion is None for medicion in mediciones):
+            print(f"{modulo:<22} no disponible")
+            continue
+        mediana = statistics.median(medicion['segundos'] for medicion in mediciones)
+        print(f"{modulo:<22} {mediana * 1000:>10.1f} ms")
+
+    mediciones_render = [medir_primer_render() for _ in range(repeticiones)]
+    print()
+    if any(medicion is None for medicion in mediciones_render):
+        print(f"{'primer render':<22} no disponible")
+    else:
+        mediana = statistics.median(medicion['segundos'] for medicion in mediciones_render)
+        print(f"{'primer render':<22} {mediana * 1000:>10.1f} ms")
+
+    # El primer render incluye main(); si no está disponible se usa la importación de app.py
+    medicion_app = mediciones_render[0] or medir_importacion('app')
+    if medicion_app is not None:
+        cargados = set(medicion_app['cargados'])
+        print()
+        print("Módulos diferidos cargados al iniciar app.py")
+        print("-" * 50)
+        for modulo in MODULOS_DIFERIDOS:
+            estado = "cargado" if modulo in cargados else "diferido"
+            print(f"{modulo:<22} {estado}")
+
+
+if __name__ == "__main__":
+    main()
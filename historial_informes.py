@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+# Configuración del histórico de informes
+DIRECTORIO_HISTORIAL = os.environ.get("HISTORIAL_INFORMES_DIR", "historial_informes")
+ARCHIVO_INDICE = "indice.json"
+CUOTA_DISCO_BYTES = int(os.environ.get("HISTORIAL_INFORMES_CUOTA_MB", "200")) * 1024 * 1024
+MAX_INFORMES = int(os.environ.get("HISTORIAL_INFORMES_MAX", "100"))
+
+# Streamlit atiende cada sesión en un hilo distinto; el índice se protege con un lock
+_lock_indice = threading.Lock()
+
+
+def calcular_hash_datos(df):
+    """Calcula una huella del contenido de la base de datos cargada"""
+    valores = pd.util.hash_pandas_object(df, index=True).values
+    return hashlib.sha256(valores.tobytes()).hexdigest()
+
+
+def calcular_clave_informe(nits, filtros, hash_datos, incluir_gpt):
+    """Genera la clave que identifica un informe por selección, filtros, datos y uso de GPT"""
+    contenido = json.dumps({
+        'nits': sorted(str(nit) for nit in nits),
+        'filtros': filtros,
+        'hash_datos': hash_datos,
+        'incluir_gpt': bool(incluir_gpt)
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+def _ruta_indice(directorio):
+    return os.path.join(directorio, ARCHIVO_INDICE)
+
+
+def _ruta_pdf(directorio, clave):
+    return os.path.join(directorio, f"{clave}.pdf")
+
+
+def _leer_indice(directorio):
+    """Lee el índice del histórico; un índice ausente o dañado equivale a uno vacío"""
+    try:
+        with open(_ruta_indice(directorio), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _escribir_indice(directorio, indice):
+    """Escribe el índice de forma atómica para no dejarlo a medias"""
+    ruta = _ruta_indice(directorio)
+    ruta_tmp = f"{ruta}.tmp"
+    with open(ruta_tmp, 'w', encoding='utf-8') as f:
+        json.dump(indice, f, ensure_ascii=False, indent=2)
+    os.replace(ruta_tmp, ruta)
+
+
+def _desalojar(directorio, indice, cuota_bytes, max_informes):
+    """Elimina los informes usados hace más tiempo hasta cumplir la cuota de disco y de cantidad"""
+    por_antiguedad = sorted(indice.items(), key=lambda item: item[1]['ultimo_acceso'])
+    total_bytes = sum(meta['tamano_bytes'] for meta in indice.values())
+    for clave, meta in por_antiguedad:
+        if total_bytes <= cuota_bytes and len(indice) <= max_informes:
+            break
+        try:
+            os.remove(_ruta_pdf(directorio, clave))
+        except FileNotFoundError:
+            pass
+        total_bytes -= meta['tamano_bytes']
+        del indice[clave]
+
+
+def buscar_informe(clave, directorio=DIRECTORIO_HISTORIAL, registrar_acceso=True):
+    """Devuelve el PDF almacenado para la clave (o None) y, si se indica, actualiza su último acceso"""
+    with _lock_indice:
+        indice = _leer_indice(directorio)
+        meta = indice.get(clave)
+        if meta is None:
+            return None
+        try:
+            with open(_ruta_pdf(directorio, clave), 'rb') as f:
+                contenido = f.read()
+        except FileNotFoundError:
+            # El archivo desapareció del disco: se limpia la entrada huérfana
+            del indice[clave]
+            _escribir_indice(directorio, indice)
+            return None
+        if registrar_acceso:
+            meta['ultimo_acceso'] = datetime.now().isoformat()
+            _escribir_indice(directorio, indice)
+        return contenido
+
+
+def guardar_informe(clave, pdf_bytes, metadatos, directorio=DIRECTORIO_HISTORIAL,
+                    cuota_bytes=CUOTA_DISCO_BYTES, max_informes=MAX_INFORMES):
+    """Almacena un informe PDF con sus metadatos y aplica la política de desalojo LRU
+
+    Devuelve False sin tocar el histórico si el informe por sí solo supera la cuota.
+    """
+    if len(pdf_bytes) > cuota_bytes:
+        return False
+    os.makedirs(directorio, exist_ok=True)
+    with _lock_indice:
+        with open(_ruta_pdf(directorio, clave), 'wb') as f:
+            f.write(pdf_bytes)
+        ahora = datetime.now().isoformat()
+        indice = _leer_indice(directorio)
+        indice[clave] = {
+            **metadatos,
+            'creado': ahora,
+            'ultimo_acceso': ahora,
+            'tamano_bytes': len(pdf_bytes)
+        }
+        _desalojar(directorio, indice, cuota_bytes, max_informes)
+        _escribir_indice(directorio, indice)
+    return True
+
+
+def listar_informes(directorio=DIRECTORIO_HISTORIAL):
+    """Lista los informes almacenados, del más reciente al más antiguo"""
+    with _lock_indice:
+        indice = _leer_indice(directorio)
+    informes = [{'clave': clave, **meta} for clave, meta in indice.items()]
+    return sorted(informes, key=lambda informe: informe['creado'], reverse=True)
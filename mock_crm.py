@@ -0,0 +1,77 @@
+"""Servidor CRM simulado para probar la sincronización de prospectos en local.
+
+Acepta POST con {"filtros": ..., "empresas": [...]} en cualquier ruta, guarda
+las empresas en memoria por NIT y responde con el número de registros
+recibidos. Un lote con algún NIT de `ManejadorCRM.nits_rechazados` se rechaza
+con 422. GET devuelve las empresas almacenadas. Uso:
+
+    python mock_crm.py [puerto]
+"""
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class ManejadorCRM(BaseHTTPRequestHandler):
+    # HTTP/1.1 permite que el cliente reutilice la conexión entre lotes
+    protocol_version = "HTTP/1.1"
+
+    # Estado compartido entre conexiones
+    empresas = {}
+    lotes_recibidos = []
+    nits_rechazados = set()
+    lock = threading.Lock()
+
+    @classmethod
+    def reiniciar(cls):
+        """Vacía las empresas y lotes almacenados"""
+        with cls.lock:
+            cls.empresas.clear()
+            cls.lotes_recibidos.clear()
+            cls.nits_rechazados.clear()
+
+    def _responder(self, codigo, cuerpo):
+        contenido = json.dumps(cuerpo, ensure_ascii=False).encode('utf-8')
+        self.send_response(codigo)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(contenido)))
+        self.end_headers()
+        self.wfile.write(contenido)
+
+    def do_POST(self):
+        longitud = int(self.headers.get('Content-Length', 0))
+        try:
+            datos = json.loads(self.rfile.read(longitud))
+            empresas = {empresa['nit']: empresa for empresa in datos['empresas']}
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            self._responder(400, {'error': f"Solicitud inválida: {e}"})
+            return
+        with self.lock:
+            rechazados = self.nits_rechazados.intersection(empresas)
+            if rechazados:
+                self._responder(422, {'error': f"NITs rechazados: {sorted(rechazados)}"})
+                return
+            self.lotes_recibidos.append(list(empresas))
+            self.empresas.update(empresas)
+        self._responder(200, {'recibidas': len(empresas)})
+
+    def do_GET(self):
+        with self.lock:
+            self._responder(200, {'empresas': list(self.empresas.values())})
+
+    def log_message(self, format, *args):
+        # Silencioso salvo que se ejecute como script
+        if __name__ == "__main__":
+            super().log_message(format, *args)
+
+
+def main():
+    puerto = int(sys.argv[1]) if len(sys.argv) > 1 else 8600
+    servidor = ThreadingHTTPServer(('127.0.0.1', puerto), ManejadorCRM)
+    print(f"CRM simulado escuchando en http://127.0.0.1:{puerto}")
+    servidor.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
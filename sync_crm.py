@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Configuración de la sincronización con el CRM
+ARCHIVO_ESTADO = os.environ.get("CRM_SYNC_ESTADO", "crm_sync_estado.json")
+TAMANO_LOTE = 100
+MAX_CONCURRENCIA = 4
+REINTENTOS = 3
+TIMEOUT_SEGUNDOS = 30
+
+# Columnas del DataFrame clasificado que se envían al CRM
+COLUMNAS_CRM = {
+    'NIT': 'nit',
+    'RAZON_SOCIAL': 'razon_social',
+    'CIIU': 'ciiu',
+    'MACROSECTOR': 'macrosector',
+    'REGION': 'region',
+    'DEPARTAMENTO': 'departamento',
+    'CIUDAD': 'ciudad',
+    'INGRESOS_2024': 'ingresos_2024',
+    'GANANCIA_2024': 'ganancia_2024',
+    'ACTIVOS_2024': 'activos_2024',
+    'CRECIMIENTO_INGRESOS': 'crecimiento_ingresos',
+    'MARGEN_GANANCIA_2024': 'margen_ganancia_2024',
+    'RATIO_ENDEUDAMIENTO': 'ratio_endeudamiento',
+    'ES_CLIENTE_POTENCIAL': 'es_cliente_potencial'
+}
+
+
+def _mascara_con_nit(df):
+    """Filas con un NIT utilizable como identificador en el CRM"""
+    return df['NIT'].notna() & (df['NIT'].astype(str).str.strip() != '')
+
+
+def preparar_registros(df):
+    """Convierte el DataFrame clasificado en registros JSON para el CRM"""
+    columnas = [col for col in COLUMNAS_CRM if col in df.columns]
+    df_crm = df[columnas].rename(columns=COLUMNAS_CRM)
+    df_crm = df_crm.astype(object).where(pd.notna(df_crm), None)
+    df_crm['nit'] = df_crm['nit'].astype(str)
+    return df_crm.to_dict('records')
+
+
+def calcular_hash_registro(registro):
+    """Huella del contenido de un registro para detectar cambios entre sincronizaciones"""
+    contenido = json.dumps(registro, sort_keys=True, default=str)
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+def cargar_estado(ruta=ARCHIVO_ESTADO):
+    """Lee el último hash enviado por endpoint y NIT; un estado ausente o dañado equivale a uno vacío"""
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def guardar_estado(estado, ruta=ARCHIVO_ESTADO):
+    """Escribe el estado de forma atómica"""
+    ruta_tmp = f"{ruta}.tmp"
+    with open(ruta_tmp, 'w', encoding='utf-8') as f:
+        json.dump(estado, f, indent=2)
+    os.replace(ruta_tmp, ruta)
+
+
+def crear_sesion(max_concurrencia=MAX_CONCURRENCIA, reintentos=REINTENTOS, token=None):
+    """Crea una sesión HTTP con conexiones persistentes y reintentos con espera exponencial"""
+    retry = Retry(
+        total=reintentos,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["POST"]
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrencia, max_retries=retry)
+    sesion = requests.Session()
+    sesion.mount("http://", adapter)
+    sesion.mount("https://", adapter)
+    sesion.headers.update({'Content-Type': 'application/json'})
+    if token:
+        sesion.headers.update({'Authorization': f"Bearer {token}"})
+    return sesion
+
+
+def _enviar_lote(sesion, url_crm, lote, filtros):
+    """Envía un lote de empresas al endpoint de upsert del CRM"""
+    respuesta = sesion.post(
+        url_crm,
+        data=json.dumps({'filtros': filtros, 'empresas': lote}, default=str),
+        timeout=TIMEOUT_SEGUNDOS
+    )
+    respuesta.raise_for_status()
+
+
+def sincronizar_prospectos(df, filtros, url_crm, token=None, tamano_lote=TAMANO_LOTE,
+                           max_concurrencia=MAX_CONCURRENCIA, reintentos=REINTENTOS,
+                           simulacion=False, forzar=False, ruta_estado=ARCHIVO_ESTADO):
+    """Sincroniza con el CRM las empresas filtradas que cambiaron desde el último envío
+
+    Las empresas se envían en lotes de `tamano_lote` con a lo sumo `max_concurrencia`
+    solicitudes simultáneas sobre una misma sesión HTTP. El estado de lo enviado se guarda
+    por endpoint; con `forzar` se reenvían todas las empresas. En modo simulación no se
+    envía nada ni se modifica el estado. Devuelve un resumen de la sincronización.
+    """
+    # Sin NIT no hay clave para el upsert ni para el estado por empresa
+    con_nit = _mascara_con_nit(df)
+    registros = preparar_registros(df[con_nit])
+    estado = cargar_estado(ruta_estado)
+    estado_endpoint = estado.setdefault(url_crm, {})
+
+    # Solo se envían los registros cuyo contenido cambió en este endpoint
+    pendientes = []
+    for registro in registros:
+        huella = calcular_hash_registro(registro)
+        if forzar or estado_endpoint.get(registro['nit'], {}).get('hash') != huella:
+            pendientes.append((registro, huella))
+
+    lotes = [pendientes[i:i + tamano_lote] for i in range(0, len(pendientes), tamano_lote)]
+    resumen = {
+        'total': len(registros),
+        'sin_nit': int((~con_nit).sum()),
+        'sin_cambios': len(registros) - len(pendientes),
+        'pendientes': len(pendientes),
+        'lotes': len(lotes),
+        'enviados': 0,
+        'fallidos': 0,
+        'errores': [],
+        'simulacion': simulacion
+    }
+
+    if simulacion or not lotes:
+        return resumen
+
+    with crear_sesion(max_concurrencia, reintentos, token) as sesion:
+        with ThreadPoolExecutor(max_workers=max_concurrencia) as executor:
+            futuros = {
+                executor.submit(_enviar_lote, sesion, url_crm, [registro for registro, _ in lote], filtros): lote
+                for lote in lotes
+            }
+            for futuro in as_completed(futuros):
+                lote = futuros[futuro]
+                try:
+                    futuro.result()
+                except requests.RequestException as e:
+                    resumen['fallidos'] += len(lote)
+                    resumen['errores'].append(str(e))
+                    continue
+                ahora = datetime.now().isoformat()
+                for registro, huella in lote:
+                    estado_endpoint[registro['nit']] = {'hash': huella, 'sincronizado': ahora}
+                resumen['enviados'] += len(lote)
+
+    guardar_estado(estado, ruta_estado)
+    return resumen
@@ -0,0 +1,63 @@
+import os
+
+import pytest
+
+pytest.importorskip("pandas")
+
+from historial_informes import ARCHIVO_INDICE, buscar_informe, guardar_informe, listar_informes
+
+
+def claves(directorio):
+    return sorted(informe['clave'] for informe in listar_informes(directorio))
+
+
+def test_desaloja_el_mas_antiguo_por_cantidad(tmp_path):
+    for clave in ['a', 'b', 'c']:
+        guardar_informe(clave, b"%PDF", {}, directorio=str(tmp_path), max_informes=2)
+
+    assert claves(str(tmp_path)) == ['b', 'c']
+    assert not os.path.exists(tmp_path / "a.pdf")
+
+
+def test_informe_consultado_sobrevive_al_desalojo(tmp_path):
+    guardar_informe('a', b"%PDF", {}, directorio=str(tmp_path), max_informes=2)
+    guardar_informe('b', b"%PDF", {}, directorio=str(tmp_path), max_informes=2)
+
+    assert buscar_informe('a', directorio=str(tmp_path), registrar_acceso=True) == b"%PDF"
+    guardar_informe('c', b"%PDF", {}, directorio=str(tmp_path), max_informes=2)
+
+    assert claves(str(tmp_path)) == ['a', 'c']
+
+
+def test_desaloja_por_cuota_de_disco(tmp_path):
+    for clave in ['a', 'b', 'c']:
+        guardar_informe(clave, b"x" * 40, {}, directorio=str(tmp_path), cuota_bytes=100)
+
+    assert claves(str(tmp_path)) == ['b', 'c']
+
+
+def test_informe_mayor_que_la_cuota_no_se_guarda(tmp_path):
+    for clave in ['a', 'b', 'c']:
+        guardar_informe(clave, b"x" * 30, {}, directorio=str(tmp_path), cuota_bytes=100)
+    indice_antes = (tmp_path / ARCHIVO_INDICE).read_text(encoding='utf-8')
+
+    assert guardar_informe('grande', b"x" * 200, {}, directorio=str(tmp_path), cuota_bytes=100) is False
+    assert (tmp_path / ARCHIVO_INDICE).read_text(encoding='utf-8') == indice_antes
+    assert not os.path.exists(tmp_path / "grande.pdf")
+
+
+def test_pdf_ausente_elimina_la_entrada(tmp_path):
+    guardar_informe('a', b"%PDF", {}, directorio=str(tmp_path))
+    os.remove(tmp_path / "a.pdf")
+
+    assert buscar_informe('a', directorio=str(tmp_path)) is None
+    assert listar_informes(str(tmp_path)) == []
+
+
+def test_indice_danado_equivale_a_vacio(tmp_path):
+    (tmp_path / ARCHIVO_INDICE).write_text("{no es json", encoding='utf-8')
+
+    assert listar_informes(str(tmp_path)) == []
+    assert buscar_informe('a', directorio=str(tmp_path)) is None
+    assert guardar_informe('a', b"%PDF", {}, directorio=str(tmp_path)) is True
+    assert claves(str(tmp_path)) == ['a']
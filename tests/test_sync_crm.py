@@ -0,0 +1,118 @@
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("requests")
+
+from mock_crm import ManejadorCRM
+from sync_crm import cargar_estado, sincronizar_prospectos
+
+
+@pytest.fixture
+def url_crm():
+    """Levanta el CRM simulado en un puerto libre"""
+    ManejadorCRM.reiniciar()
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), ManejadorCRM)
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    yield f"http://127.0.0.1:{servidor.server_address[1]}/empresas"
+    servidor.shutdown()
+    servidor.server_close()
+
+
+@pytest.fixture
+def ruta_estado(tmp_path):
+    return str(tmp_path / "crm_sync_estado.json")
+
+
+def crear_empresas(cantidad):
+    return pd.DataFrame({
+        'NIT': [str(900000000 + i) for i in range(cantidad)],
+        'RAZON_SOCIAL': [f"EMPRESA {i}" for i in range(cantidad)],
+        'CIIU': ['C1011'] * cantidad,
+        'INGRESOS_2024': [1000.0 * (i + 1) for i in range(cantidad)],
+        'ES_CLIENTE_POTENCIAL': [True] * cantidad
+    })
+
+
+def sincronizar(df, url_crm, ruta_estado, **kwargs):
+    return sincronizar_prospectos(
+        df, {'macrosector': 'Todos'}, url_crm,
+        tamano_lote=10, max_concurrencia=3, reintentos=0,
+        ruta_estado=ruta_estado, **kwargs
+    )
+
+
+def test_envia_por_lotes(url_crm, ruta_estado):
+    resumen = sincronizar(crear_empresas(25), url_crm, ruta_estado)
+
+    assert resumen['lotes'] == 3
+    assert resumen['enviados'] == 25
+    assert resumen['fallidos'] == 0
+    assert sorted(len(lote) for lote in ManejadorCRM.lotes_recibidos) == [5, 10, 10]
+    assert len(ManejadorCRM.empresas) == 25
+
+
+def test_solo_reenvia_registros_modificados(url_crm, ruta_estado):
+    df = crear_empresas(25)
+    sincronizar(df, url_crm, ruta_estado)
+    ManejadorCRM.lotes_recibidos.clear()
+
+    df.loc[3, 'INGRESOS_2024'] = 1.0
+    resumen = sincronizar(df, url_crm, ruta_estado)
+
+    assert resumen['sin_cambios'] == 24
+    assert resumen['enviados'] == 1
+    assert ManejadorCRM.lotes_recibidos == [['900000003']]
+
+
+def test_estado_por_endpoint_y_reenvio_forzado(url_crm, ruta_estado):
+    df = crear_empresas(5)
+    sincronizar(df, url_crm, ruta_estado)
+
+    assert sincronizar(df, url_crm + "?crm=otro", ruta_estado)['enviados'] == 5
+    assert sincronizar(df, url_crm, ruta_estado)['enviados'] == 0
+    assert sincronizar(df, url_crm, ruta_estado, forzar=True)['enviados'] == 5
+
+
+def test_lote_fallido_no_se_registra(url_crm, ruta_estado):
+    ManejadorCRM.nits_rechazados.add('900000012')
+    resumen = sincronizar(crear_empresas(25), url_crm, ruta_estado)
+
+    assert resumen['enviados'] == 15
+    assert resumen['fallidos'] == 10
+    estado = cargar_estado(ruta_estado)[url_crm]
+    assert '900000012' not in estado
+    assert '900000010' not in estado
+    assert '900000000' in estado
+
+    # El lote rechazado queda pendiente para la siguiente sincronización
+    ManejadorCRM.nits_rechazados.clear()
+    resumen = sincronizar(crear_empresas(25), url_crm, ruta_estado)
+    assert resumen['enviados'] == 10
+
+
+def test_simulacion_no_envia_ni_modifica_estado(url_crm, ruta_estado):
+    resumen = sincronizar(crear_empresas(25), url_crm, ruta_estado, simulacion=True)
+
+    assert resumen['pendientes'] == 25
+    assert resumen['lotes'] == 3
+    assert resumen['enviados'] == 0
+    assert ManejadorCRM.lotes_recibidos == []
+    assert cargar_estado(ruta_estado) == {}
+
+
+def test_omite_empresas_sin_nit(url_crm, ruta_estado):
+    df = crear_empresas(5)
+    df['NIT'] = df['NIT'].astype(object)
+    df.loc[1, 'NIT'] = None
+    df.loc[2, 'NIT'] = ''
+    resumen = sincronizar(df, url_crm, ruta_estado)
+
+    assert resumen['sin_nit'] == 2
+    assert resumen['total'] == 3
+    assert resumen['enviados'] == 3
+    assert sorted(ManejadorCRM.empresas) == ['900000000', '900000003', '900000004']
+    assert sorted(cargar_estado(ruta_estado)[url_crm]) == ['900000000', '900000003', '900000004']